@@ -0,0 +1,163 @@
+"""
+Open Beauty Facts API Endpoints
+"""
+from fastapi import APIRouter, BackgroundTasks, Query
+from typing import Dict, Any, List, Optional
+import asyncio
+import threading
+import time
+
+from app.api.ocr import score_ingredients
+from app.services.ingredient_index import IngredientIndex
+from app.services.openbeautyfacts import OpenBeautyFactsClient
+from app.services.similarity_index import SimilarityIndex
+
+router = APIRouter()
+
+# Autocomplete index shared by all requests, rebuilt when the taxonomy refreshes
+_ingredient_index: Optional[IngredientIndex] = None
+_next_refresh_at = 0.0
+_refreshing = False
+
+# Wait before retrying a taxonomy refresh that could not reach upstream
+REFRESH_RETRY = 5 * 60
+
+# Ingredient-set similarity index, grown as products are looked up;
+# built at startup since replaying its insert log is slow
+_similarity_index: Optional[SimilarityIndex] = None
+_similarity_lock = threading.Lock()
+
+def _load_index_from_snapshot() -> IngredientIndex:
+    """Build the index from the on-disk snapshot only, never the network"""
+    global _ingredient_index, _next_refresh_at
+    client = OpenBeautyFactsClient()
+    snapshot = client.load_taxonomy_snapshot()
+    if snapshot:
+        _ingredient_index = IngredientIndex.from_taxonomy(snapshot["taxonomy"])
+        _next_refresh_at = snapshot["fetched_at"] + client.TAXONOMY_MAX_AGE
+    else:
+        _ingredient_index = IngredientIndex()
+    return _ingredient_index
+
+async def refresh_ingredient_index():
+    """Revalidate the taxonomy upstream and swap in a freshly built index"""
+    global _ingredient_index, _next_refresh_at, _refreshing
+    if _refreshing:
+        return
+    _refreshing = True
+    try:
+        client = OpenBeautyFactsClient()
+        taxonomy = await client.get_ingredient_taxonomy()
+        if "error" not in taxonomy:
+            _ingredient_index = await asyncio.to_thread(IngredientIndex.from_taxonomy, taxonomy)
+
+        # A stale snapshot served because upstream failed is not fresh data
+        fresh_until = client.taxonomy_fetched_at + client.TAXONOMY_MAX_AGE
+        if fresh_until > time.time():
+            _next_refresh_at = fresh_until
+        else:
+            _next_refresh_at = time.time() + REFRESH_RETRY
+    finally:
+        _refreshing = False
+
+@router.get("/ingredients/suggest")
+async def suggest_ingredients(
+    background_tasks: BackgroundTasks,
+    q: str = Query(..., min_length=1),
+    limit: int = Query(10, ge=1, le=50)
+):
+    """
+    Autocomplete ingredient names for manual entry
+    Answers from the in-memory index; a stale or missing taxonomy is
+    refreshed in the background after the response is sent
+    """
+    index = _ingredient_index
+    if index is None:
+        index = await asyncio.to_thread(_load_index_from_snapshot)
+
+    if time.time() >= _next_refresh_at and not _refreshing:
+        background_tasks.add_task(refresh_ingredient_index)
+
+    return {
+        "success": True,
+        "query": q,
+        "ready": len(index) > 0,
+        "suggestions": index.suggest(q, limit)
+    }
+
+def get_similarity_index() -> SimilarityIndex:
+    """Shared similarity index, loaded on first use; blocking, call off the event loop"""
+    global _similarity_index
+    with _similarity_lock:
+        if _similarity_index is None:
+            _similarity_index = SimilarityIndex()
+        return _similarity_index
+
+def _safety_score(ingredients: List[str]) -> float:
+    results = score_ingredients(ingredients)["results"]
+    return sum(r["safety_score"] for r in results) / len(results)
+
+def _remember_product(product: Dict[str, Any]) -> bool:
+    ingredients = product.get("ingredients_list") or []
+    if not product.get("success") or not product.get("barcode") or not ingredients:
+        return False
+    return get_similarity_index().add(
+        product["barcode"],
+        ingredients,
+        product.get("product_name") or "Unknown",
+        _safety_score(ingredients)
+    )
+
+async def remember_product(product: Dict[str, Any]) -> bool:
+    """
+    Add a successful barcode lookup to the similarity index
+    Runs in a worker thread; a failure to write the index is logged, never raised
+    """
+    try:
+        return await asyncio.to_thread(_remember_product, product)
+    except Exception as e:
+        print(f"Error adding product to similarity index: {e}")
+        return False
+
+@router.get("/alternatives/{barcode}")
+async def safer_alternatives(
+    barcode: str,
+    limit: int = Query(10, ge=1, le=50),
+    min_similarity: float = Query(0.3, ge=0.0, le=1.0)
+):
+    """
+    Suggest products with a similar formulation but a better safety score
+    Products not yet indexed are looked up and inserted first
+    """
+    try:
+        index = await asyncio.to_thread(get_similarity_index)
+    except Exception as e:
+        print(f"Error loading similarity index: {e}")
+        return {"success": False, "error": "Similarity index unavailable"}
+    # Lookups can wait on the index lock during a compaction swap
+    stored = await asyncio.to_thread(index.get, barcode)
+
+    if stored is None:
+        product = await OpenBeautyFactsClient().get_product_by_barcode(barcode)
+        if not product.get("success"):
+            return product
+        await remember_product({**product, "barcode": barcode})
+        stored = await asyncio.to_thread(index.get, barcode)
+        if stored is None:
+            return {"success": False, "error": "Product has no ingredient list"}
+
+    alternatives = await asyncio.to_thread(
+        index.similar,
+        stored["signature"],
+        limit=limit,
+        min_similarity=min_similarity,
+        min_score=stored["safety_score"],
+        exclude=barcode
+    )
+    return {
+        "success": True,
+        "barcode": barcode,
+        "product_name": stored["product_name"],
+        "safety_score": round(stored["safety_score"], 2),
+        "alternatives": alternatives
+    }
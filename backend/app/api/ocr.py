@@ -5,38 +5,26 @@ import os
 
 router = APIRouter()
 
-@router.post("/extract-text")
-async def extract_text_from_image(file: UploadFile = File(...)):
+def extract_ingredients(contents: bytes) -> dict:
     """
-    Extract text from product label image
+    Run OCR over raw label image bytes
     TODO: Integrate with Google Cloud Vision API
     """
-    try:
-        # Read the uploaded file
-        contents = await file.read()
-        
-        # For now, return mock data
-        return {
-            "success": True,
-            "filename": file.filename,
-            "content_type": file.content_type,
-            "message": "OCR processing successful (mock)",
-            "extracted_text": "Ingredients: Water, Glycerin, Sodium Laureth Sulfate...",
-            "ingredients": [
-                "Water",
-                "Glycerin",
-                "Sodium Laureth Sulfate",
-                "Cocamidopropyl Betaine",
-                "Fragrance"
-            ]
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"OCR processing failed: {str(e)}")
+    # For now, return mock data
+    return {
+        "extracted_text": "Ingredients: Water, Glycerin, Sodium Laureth Sulfate...",
+        "ingredients": [
+            "Water",
+            "Glycerin",
+            "Sodium Laureth Sulfate",
+            "Cocamidopropyl Betaine",
+            "Fragrance"
+        ]
+    }
 
-@router.post("/batch-check")
-async def batch_check_ingredients(ingredients: List[str]):
+def score_ingredients(ingredients: List[str]) -> dict:
     """
-    Check safety for multiple ingredients
+    Score a list of ingredients for safety
     TODO: Integrate with EWG API
     """
     mock_results = []
@@ -55,3 +43,31 @@ async def batch_check_ingredients(ingredients: List[str]):
         "average_score": 6.0,
         "overall_rating": "Moderate"
     }
+
+@router.post("/extract-text")
+async def extract_text_from_image(file: UploadFile = File(...)):
+    """
+    Extract text from product label image
+    """
+    try:
+        # Read the uploaded file
+        contents = await file.read()
+        ocr_result = extract_ingredients(contents)
+        
+        return {
+            "success": True,
+            "filename": file.filename,
+            "content_type": file.content_type,
+            "message": "OCR processing successful (mock)",
+            "extracted_text": ocr_result["extracted_text"],
+            "ingredients": ocr_result["ingredients"]
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"OCR processing failed: {str(e)}")
+
+@router.post("/batch-check")
+async def batch_check_ingredients(ingredients: List[str]):
+    """
+    Check safety for multiple ingredients
+    """
+    return score_ingredients(ingredients)
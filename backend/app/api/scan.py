@@ -0,0 +1,112 @@
+"""
+End-to-end Scan API Endpoint
+Runs the barcode lookup and OCR stages concurrently and returns one response
+"""
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from typing import Dict, Any, List, Optional
+import asyncio
+
+from app.api.beauty import remember_product
+from app.api.ocr import extract_ingredients, score_ingredients
+from app.api.sentiment import get_product_sentiment
+from app.services.ingredient_index import normalize_ingredient
+from app.services.openbeautyfacts import OpenBeautyFactsClient
+
+router = APIRouter()
+
+# Per-stage time budget in seconds; a stage that overruns is dropped
+# and whatever the other stages produced is still returned
+STAGE_TIMEOUT = 6.0
+
+async def _run_stage(coro) -> Dict[str, Any]:
+    """Await a stage and report its status instead of raising"""
+    try:
+        result = await asyncio.wait_for(coro, timeout=STAGE_TIMEOUT)
+        return {"status": "ok", "result": result}
+    except asyncio.TimeoutError:
+        return {"status": "timeout", "result": None}
+    except Exception as e:
+        return {"status": "failed", "result": None, "error": str(e)}
+
+async def _skipped() -> Dict[str, Any]:
+    return {"status": "skipped", "result": None}
+
+def _merge_ingredients(*sources: List[str]) -> List[str]:
+    """
+    Merge ingredient lists, keeping first-seen order and dropping duplicates
+    Entries match on their normalized name, so "en:sodium-laureth-sulfate"
+    and "Sodium Laureth Sulfate" are one ingredient; later sources supply
+    the display name when several have it
+    """
+    merged: Dict[str, str] = {}
+    for source in sources:
+        for ingredient in source:
+            key = normalize_ingredient(ingredient)
+            if key:
+                merged[key] = ingredient.strip()
+    return list(merged.values())
+
+@router.post("/scan")
+async def scan_product(
+    file: Optional[UploadFile] = File(None),
+    barcode: Optional[str] = Form(None)
+):
+    """
+    Scan a product from a label image and/or a barcode in a single request
+    Barcode lookup and OCR run concurrently, then the merged ingredients
+    are scored and the product's review sentiment is attached
+    """
+    if file is None and not barcode:
+        raise HTTPException(status_code=400, detail="Provide an image file or a barcode")
+
+    contents = await file.read() if file is not None else None
+
+    lookup_stage = (
+        _run_stage(OpenBeautyFactsClient().get_product_by_barcode(barcode))
+        if barcode else _skipped()
+    )
+    ocr_stage = (
+        _run_stage(asyncio.to_thread(extract_ingredients, contents))
+        if contents is not None else _skipped()
+    )
+    lookup, ocr = await asyncio.gather(lookup_stage, ocr_stage)
+
+    # A lookup that completed but found nothing is a failed stage
+    product = lookup["result"]
+    if product is not None and not product.get("success"):
+        lookup = {"status": "failed", "result": None, "error": product.get("error")}
+        product = None
+    elif product is not None:
+        await remember_product(product)
+
+    # OCR goes last so its label spelling wins over OBF taxonomy tags
+    ingredients = _merge_ingredients(
+        product.get("ingredients_list", []) if product else [],
+        ocr["result"]["ingredients"] if ocr["result"] else []
+    )
+
+    safety = score_ingredients(ingredients) if ingredients else None
+
+    sentiment = await _run_stage(
+        asyncio.to_thread(get_product_sentiment, product.get("product_name"), product.get("brands"))
+    ) if product else await _skipped()
+
+    stages = {"lookup": lookup, "ocr": ocr, "sentiment": sentiment}
+
+    return {
+        "success": bool(product or ingredients),
+        "partial": any(stage["status"] in ("timeout", "failed") for stage in stages.values()),
+        "stages": {
+            name: {k: v for k, v in stage.items() if k != "result"}
+            for name, stage in stages.items()
+        },
+        "product_info": {
+            "barcode": product.get("barcode", barcode),
+            "name": product.get("product_name"),
+            "brand": product.get("brands")
+        } if product else None,
+        "extracted_text": ocr["result"]["extracted_text"] if ocr["result"] else None,
+        "ingredients": ingredients,
+        "safety": safety,
+        "sentiment": sentiment["result"]
+    }
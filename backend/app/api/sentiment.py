@@ -1,13 +1,19 @@
 """
 Simplified Sentiment Analysis API Endpoints
 """
-from fastapi import APIRouter, HTTPException
-from typing import Dict, Any, List
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from typing import Dict, Any, List, Optional
 import pandas as pd
+import asyncio
 import json
 import os
+import re
+import unicodedata
 from pathlib import Path
 
+from app.services.sentiment_stream import SummaryBroadcaster
+
 router = APIRouter()
 
 # Sample data - this will always work
@@ -37,6 +43,80 @@ SAMPLE_SENTIMENT_DATA = {
     }
 }
 
+RESULTS_FILE = Path("../data/reviews") / "sentiment_results.csv"
+
+def _summarize(df: pd.DataFrame) -> Dict[str, Any]:
+    """Aggregate a sentiment results frame into the summary payload"""
+    total = len(df)
+    pos_count = (df['sentiment'] == 'positive').sum()
+    neu_count = (df['sentiment'] == 'neutral').sum()
+    neg_count = (df['sentiment'] == 'negative').sum()
+    
+    return {
+        "total_reviews": int(total),
+        "sentiment_distribution": {
+            "positive": int(pos_count),
+            "neutral": int(neu_count),
+            "negative": int(neg_count)
+        },
+        "percentages": {
+            "positive": round((pos_count/total)*100, 1),
+            "neutral": round((neu_count/total)*100, 1),
+            "negative": round((neg_count/total)*100, 1)
+        },
+        "average_sentiment_score": round(df['score'].mean(), 3),
+        "average_rating": round(df['rating'].mean(), 1),
+        "top_issues": SAMPLE_SENTIMENT_DATA["data"]["top_issues"]
+    }
+
+def _load_summary() -> Optional[Dict[str, Any]]:
+    """Summary of the results file, or None if there is nothing to report"""
+    if not RESULTS_FILE.exists():
+        return None
+    df = pd.read_csv(RESULTS_FILE)
+    return _summarize(df) if len(df) > 0 else None
+
+# Shared by every dashboard connection; only re-reads the CSV when it changes
+_broadcaster = SummaryBroadcaster(RESULTS_FILE, _load_summary)
+
+# Seconds between SSE comments that keep idle proxies from closing the stream
+STREAM_KEEPALIVE = 15.0
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def _normalize_name(name: str) -> str:
+    """Lowercase, strip accents and collapse punctuation for name comparison"""
+    name = unicodedata.normalize("NFKD", str(name).lower())
+    name = "".join(c for c in name if not unicodedata.combining(c))
+    return re.sub(r"[^a-z0-9]+", " ", name).strip()
+
+def get_product_sentiment(product_name: str, brands: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Summarize review sentiment for a single product
+    Reviews match on the exact normalized name, alone or prefixed with one
+    of the product's brands; returns None when no reviews match
+    """
+    if not product_name or not RESULTS_FILE.exists():
+        return None
+
+    wanted = {_normalize_name(product_name)}
+    for brand in (brands or "").split(","):
+        if brand.strip() and brand.strip().lower() != "unknown":
+            wanted.add(_normalize_name(f"{brand} {product_name}"))
+    wanted.discard("")
+
+    df = pd.read_csv(RESULTS_FILE)
+    matches = df[df['product'].map(_normalize_name).isin(wanted)]
+    if len(matches) == 0:
+        return None
+
+    summary = _summarize(matches)
+    # The issue list is sample data for the whole dashboard, not this product
+    summary.pop("top_issues")
+    summary["product_name"] = product_name
+    return summary
+
 @router.get("/sentiment/summary")
 async def get_sentiment_summary():
     """
@@ -44,37 +124,10 @@ async def get_sentiment_summary():
     """
     try:
         # Try to read real data, fall back to sample
-        data_dir = Path("../data/reviews")
-        results_file = data_dir / "sentiment_results.csv"
-        
-        if results_file.exists():
-            df = pd.read_csv(results_file)
+        if RESULTS_FILE.exists():
+            df = pd.read_csv(RESULTS_FILE)
             if len(df) > 0:
-                # Calculate real stats
-                total = len(df)
-                pos_count = (df['sentiment'] == 'positive').sum()
-                neu_count = (df['sentiment'] == 'neutral').sum()
-                neg_count = (df['sentiment'] == 'negative').sum()
-                
-                return {
-                    "success": True,
-                    "data": {
-                        "total_reviews": int(total),
-                        "sentiment_distribution": {
-                            "positive": int(pos_count),
-                            "neutral": int(neu_count),
-                            "negative": int(neg_count)
-                        },
-                        "percentages": {
-                            "positive": round((pos_count/total)*100, 1),
-                            "neutral": round((neu_count/total)*100, 1),
-                            "negative": round((neg_count/total)*100, 1)
-                        },
-                        "average_sentiment_score": round(df['score'].mean(), 3),
-                        "average_rating": round(df['rating'].mean(), 1),
-                        "top_issues": SAMPLE_SENTIMENT_DATA["data"]["top_issues"]
-                    }
-                }
+                return {"success": True, "data": _summarize(df)}
         
         # Return sample data if no real data
         return SAMPLE_SENTIMENT_DATA
@@ -84,6 +137,38 @@ async def get_sentiment_summary():
         print(f"Error in sentiment API: {e}")
         return SAMPLE_SENTIMENT_DATA
 
+@router.get("/sentiment/stream")
+async def stream_sentiment_summary(request: Request):
+    """
+    Server-Sent Events feed of the sentiment summary
+    Sends a full "snapshot" first, then "delta" events carrying only the
+    fields that changed whenever new results land
+    """
+    async def events():
+        subscriber = await _broadcaster.subscribe()
+        snapshot = lambda: _sse("snapshot", {"success": True, "data": _broadcaster.summary or SAMPLE_SENTIMENT_DATA["data"]})
+        try:
+            yield snapshot()
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), timeout=STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if event["event"] == "resync":
+                    subscriber.needs_snapshot = False
+                    yield snapshot()
+                else:
+                    yield _sse(event["event"], event["data"])
+        finally:
+            _broadcaster.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/sentiment/health")
 async def sentiment_health():
     """Simple health check for sentiment API"""
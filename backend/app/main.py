@@ -1,6 +1,7 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.api import ocr, sentiment
+from app.api import beauty, ocr, scan, sentiment
+import asyncio
 import uvicorn
 
 app = FastAPI(
@@ -21,6 +22,16 @@ app.add_middleware(
 # Include routers
 app.include_router(ocr.router, prefix="/api/ocr", tags=["OCR"])
 app.include_router(sentiment.router, prefix="/api", tags=["Sentiment"])
+app.include_router(scan.router, prefix="/api", tags=["Scan"])
+app.include_router(beauty.router, prefix="/api/beauty", tags=["Open Beauty Facts"])
+
+@app.on_event("startup")
+async def load_similarity_index():
+    # Replaying the insert log is slow, so do it before the first request
+    try:
+        await asyncio.to_thread(beauty.get_similarity_index)
+    except Exception as e:
+        print(f"Similarity index not loaded at startup: {e}")
 
 @app.get("/")
 async def root():
@@ -0,0 +1,219 @@
+"""
+In-memory Ingredient Index for autocomplete
+Built from the Open Beauty Facts ingredient taxonomy, served without network access
+"""
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from typing import Dict, List, Any, Iterable, Tuple
+import heapq
+import re
+import unicodedata
+
+# Only the head of each key takes part in typo-tolerant candidate lookup
+FUZZY_PREFIX_LENGTH = 8
+# Upper bound on candidates checked with the (slow) edit distance per query
+FUZZY_CANDIDATES = 32
+# Upper bound on posting entries scanned per query, rarest bigrams first
+FUZZY_SCAN_LIMIT = 2000
+# Prefixes matching more keys than this are answered from a precomputed
+# popularity ranking of PREFIX_TOP entries instead of scanning their range
+PREFIX_SCAN_LIMIT = 2000
+PREFIX_TOP = 50
+# Sorts after every normalized key that starts with a given prefix
+_PREFIX_END = "\U0010ffff"
+
+def normalize_ingredient(name: str) -> str:
+    """Lowercase, strip accents, language prefixes and punctuation"""
+    name = re.sub(r"^[a-z]{2}:", "", name.strip().lower())
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(c for c in name if not unicodedata.combining(c))
+    name = re.sub(r"[^a-z0-9]+", " ", name)
+    return name.strip()
+
+def _prefix_distance(query: str, key: str, limit: int) -> int:
+    """
+    Damerau-Levenshtein distance between query and the closest prefix of key,
+    giving up early once it exceeds limit
+    """
+    key = key[:len(query) + limit]
+    prev2 = None
+    prev = list(range(len(key) + 1))
+    for i in range(1, len(query) + 1):
+        cur = [i] + [0] * len(key)
+        for j in range(1, len(key) + 1):
+            cost = 0 if query[i - 1] == key[j - 1] else 1
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if prev2 is not None and j > 1 and query[i - 1] == key[j - 2] and query[i - 2] == key[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        if min(cur) > limit:
+            return limit + 1
+        prev2, prev = prev, cur
+    return min(prev)
+
+class IngredientIndex:
+    """
+    Sorted array of normalized ingredient names and synonyms
+
+    Exact prefixes are answered with a binary search over the sorted keys,
+    ranked by popularity across the whole matching range; prefixes shared by
+    very many keys (e.g. "a", "so") use a ranking precomputed at build time.
+    When that yields too few results, a positional bigram index proposes
+    candidates that are verified with a bounded edit distance on the prefix.
+    A query bigram only votes for keys holding it within max_distance
+    positions of where it sits in the query, which keeps posting lists short.
+    """
+
+    def __init__(self, entries: Iterable[Dict[str, Any]] = ()):
+        self.names: List[str] = []
+        self.popularity: List[int] = []
+        keyed: Dict[str, int] = {}
+
+        for entry in entries:
+            entry_id = len(self.names)
+            self.names.append(entry["name"])
+            self.popularity.append(int(entry.get("products", 0) or 0))
+            for term in [entry["name"], *entry.get("synonyms", [])]:
+                key = normalize_ingredient(term)
+                if key and key not in keyed:
+                    keyed[key] = entry_id
+
+        self.keys: List[str] = sorted(keyed)
+        self.key_entries: List[int] = [keyed[key] for key in self.keys]
+        self.top_by_prefix: Dict[str, List[int]] = self._rank_large_prefixes()
+
+        self.bigrams: Dict[Tuple[str, int], List[int]] = defaultdict(list)
+        for position, key in enumerate(self.keys):
+            for offset, gram in self._bigrams(key):
+                self.bigrams[(gram, offset)].append(position)
+
+    @staticmethod
+    def _bigrams(text: str) -> List[Tuple[int, str]]:
+        head = text[:FUZZY_PREFIX_LENGTH]
+        return [(i, head[i:i + 2]) for i in range(len(head) - 1)]
+
+    def _top_entries(self, start: int, end: int, limit: int) -> List[int]:
+        """Most widely used distinct entries among keys[start:end]"""
+        return heapq.nsmallest(
+            limit,
+            set(self.key_entries[start:end]),
+            key=lambda e: (-self.popularity[e], self.names[e])
+        )
+
+    def _rank_large_prefixes(self) -> Dict[str, List[int]]:
+        """Top entries for every prefix whose key range exceeds PREFIX_SCAN_LIMIT"""
+        ranked = {}
+        ranges = [(0, len(self.keys), 0)]
+        while ranges:
+            start, end, depth = ranges.pop()
+            if end - start <= PREFIX_SCAN_LIMIT:
+                continue
+            if depth:
+                ranked[self.keys[start][:depth]] = self._top_entries(start, end, PREFIX_TOP)
+            # Keys are sorted, so each one-character-longer prefix is a contiguous run
+            position = start
+            while position < end:
+                if len(self.keys[position]) <= depth:
+                    position += 1
+                    continue
+                child = self.keys[position][:depth + 1]
+                child_end = bisect_left(self.keys, child + _PREFIX_END, position, end)
+                ranges.append((position, child_end, depth + 1))
+                position = child_end
+        return ranked
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @classmethod
+    def from_taxonomy(cls, taxonomy: Dict[str, Any]) -> "IngredientIndex":
+        """
+        Build from either the /ingredients.json facet list ({"tags": [...]})
+        or the full taxonomy export ({"en:water": {"name": ..., "synonyms": ...}})
+        """
+        entries = []
+        if isinstance(taxonomy.get("tags"), list):
+            for tag in taxonomy["tags"]:
+                name = tag.get("name") or tag.get("id", "")
+                if name:
+                    entries.append({
+                        "name": name,
+                        "synonyms": [tag.get("id", "")],
+                        "products": tag.get("products", 0)
+                    })
+        else:
+            for tag_id, node in taxonomy.items():
+                if not isinstance(node, dict):
+                    continue
+                names = node.get("name", {})
+                synonyms = [s for group in node.get("synonyms", {}).values() for s in group]
+                name = names.get("en") or next(iter(names.values()), tag_id)
+                entries.append({
+                    "name": name,
+                    "synonyms": [tag_id, *names.values(), *synonyms],
+                    "products": node.get("products", 0)
+                })
+        return cls(entries)
+
+    def _prefix_matches(self, prefix: str, limit: int) -> List[int]:
+        if prefix in self.top_by_prefix:
+            return self.top_by_prefix[prefix][:limit]
+        start = bisect_left(self.keys, prefix)
+        end = bisect_left(self.keys, prefix + _PREFIX_END, start)
+        return self._top_entries(start, end, limit)
+
+    def _fuzzy_matches(self, prefix: str, max_distance: int) -> List[Tuple[int, int]]:
+        postings = []
+        for offset, gram in self._bigrams(prefix):
+            lists = [
+                self.bigrams.get((gram, shifted), ())
+                for shifted in range(max(0, offset - max_distance), offset + max_distance + 1)
+            ]
+            postings.append((sum(len(l) for l in lists), lists))
+        postings.sort(key=lambda p: p[0])
+
+        votes: Counter = Counter()
+        scanned = grams_used = 0
+        for size, lists in postings:
+            if scanned + size > FUZZY_SCAN_LIMIT and grams_used:
+                break
+            for posting in lists:
+                votes.update(posting)
+            scanned += size
+            grams_used += 1
+
+        # Each edit can break at most two bigrams of the query
+        needed = max(1, grams_used - 2 * max_distance)
+        matches = []
+        # Most shared bigrams first; among ties, the more widely used ingredient
+        candidates = heapq.nsmallest(
+            FUZZY_CANDIDATES,
+            (item for item in votes.items() if item[1] >= needed),
+            key=lambda item: (-item[1], -self.popularity[self.key_entries[item[0]]])
+        )
+        for position, _ in candidates:
+            distance = _prefix_distance(prefix, self.keys[position], max_distance)
+            if distance <= max_distance:
+                matches.append((distance, self.key_entries[position]))
+        return matches
+
+    def suggest(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Return up to limit ingredients whose name or synonym starts with query"""
+        prefix = normalize_ingredient(query)
+        if not prefix or not self.keys:
+            return []
+
+        ranked: Dict[int, int] = {}
+        for entry_id in self._prefix_matches(prefix, limit):
+            ranked.setdefault(entry_id, 0)
+
+        if len(ranked) < limit and len(prefix) >= 4:
+            max_distance = 1 if len(prefix) < 6 else 2
+            for distance, entry_id in self._fuzzy_matches(prefix, max_distance):
+                if ranked.get(entry_id, distance) >= distance:
+                    ranked[entry_id] = distance
+
+        ordered = sorted(ranked, key=lambda e: (ranked[e], -self.popularity[e], self.names[e]))
+        return [
+            {"name": self.names[entry_id], "distance": ranked[entry_id], "products": self.popularity[entry_id]}
+            for entry_id in ordered[:limit]
+        ]
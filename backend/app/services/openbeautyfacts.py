@@ -2,70 +2,258 @@
 Open Beauty Facts API Integration Service
 """
 import httpx
-from typing import Dict, Any
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+from pathlib import Path
+import asyncio
+import gzip
+import json
+import random
+import time
+
+from app.services.resilience import CircuitBreaker, CircuitOpenError, LatencyTracker, RetryBudget
+
+class UpstreamState:
+    """
+    Health of the upstream endpoints, shared by every client instance so
+    that latency history and breaker state survive across requests
+    """
+
+    def __init__(self):
+        self.latency = {"beauty": LatencyTracker(), "universal": LatencyTracker()}
+        self.breakers = {"beauty": CircuitBreaker(), "universal": CircuitBreaker()}
+        self.retry_budget = RetryBudget()
+        # Last good lookup per barcode, served while upstream is unhealthy
+        self.products: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+_shared_state = UpstreamState()
 
 class OpenBeautyFactsClient:
     """Client for Open Beauty Facts API - No authentication required"""
 
-    def __init__(self):
+    def __init__(self, taxonomy_snapshot: Optional[Path] = None,
+                 transport: Optional[httpx.AsyncBaseTransport] = None,
+                 state: Optional[UpstreamState] = None):
         self.BASE_URL = "https://world.openbeautyfacts.org/api/v2"
+        self.UNIVERSAL_SCAN_URL = "https://world.openfoodfacts.org/api/v2/product"
+        self.TAXONOMY_URL = "https://world.openbeautyfacts.org/ingredients.json"
         self.USER_AGENT = "CosmeticSafetyScanner/1.0"
+        # Compressed on-disk copy of the taxonomy, revalidated with its ETag
+        self.TAXONOMY_SNAPSHOT = taxonomy_snapshot or Path("../data/taxonomy/ingredients.json.gz")
+        self.TAXONOMY_MAX_AGE = 24 * 60 * 60
+        self.taxonomy_fetched_at = 0.0
+        self.MAX_RETRIES = 1
+        self.RETRY_BACKOFF = 0.2
+        self.PRODUCT_CACHE_SIZE = 1024
+        self.transport = transport
+        self.state = state or _shared_state
 
-    async def get_product_by_barcode(self, barcode: str) -> Dict[str, Any]:
-        """Fetch cosmetic product by barcode"""
-        url = f"{self.BASE_URL}/product/{barcode}.json"
+    async def _request(self, upstream: str, url: str, params: Optional[Dict] = None) -> Dict[str, Any]:
+        """Single upstream call, guarded by the breaker and timed for the latency tracker"""
+        breaker = self.state.breakers[upstream]
+        if not breaker.allow():
+            raise CircuitOpenError(f"{upstream} upstream is unavailable")
 
-        async with httpx.AsyncClient() as client:
-            try:
+        latency = self.state.latency[upstream]
+        started = time.monotonic()
+        try:
+            async with httpx.AsyncClient(transport=self.transport) as client:
                 response = await client.get(
                     url,
+                    params=params,
                     headers={"User-Agent": self.USER_AGENT},
-                    timeout=10.0
+                    timeout=latency.timeout(),
+                    follow_redirects=True
                 )
-                data = response.json()
-
-                if data.get("status") == 1:
-                    product = data.get("product", {})
-                    return {
-                        "success": True,
-                        "source": "Open Beauty Facts",
-                        "barcode": product.get("code", barcode),
-                        "product_name": product.get("product_name", "Unknown"),
-                        "brands": product.get("brands", "Unknown"),
-                        "ingredients_text": product.get("ingredients_text", ""),
-                        "ingredients_list": product.get("ingredients_tags", []),
-                    }
-                else:
-                    return {"success": False, "error": "Product not found"}
-            except Exception as e:
-                return {"success": False, "error": f"API request failed: {str(e)}"}
+            # A 404 still carries a valid "product not found" body
+            if response.status_code >= 500 or response.status_code == 429:
+                response.raise_for_status()
+            data = response.json()
+        except asyncio.CancelledError:
+            # A hedged loser was at least this slow; leaving it out would
+            # hide the slow tail from the percentiles
+            latency.record(time.monotonic() - started)
+            breaker.record_cancelled()
+            raise
+        except httpx.TimeoutException:
+            latency.record(time.monotonic() - started)
+            breaker.record_failure()
+            raise
+        except (httpx.HTTPError, ValueError):
+            breaker.record_failure()
+            raise
+
+        latency.record(time.monotonic() - started)
+        breaker.record_success()
+        return data
+
+    async def _fetch(self, upstream: str, url: str, params: Optional[Dict] = None) -> Dict[str, Any]:
+        """Upstream call with jittered retries, as far as the retry budget allows"""
+        for attempt in range(self.MAX_RETRIES + 1):
+            try:
+                return await self._request(upstream, url, params)
+            except CircuitOpenError:
+                raise
+            except (httpx.HTTPError, ValueError):
+                if attempt == self.MAX_RETRIES or not self.state.retry_budget.try_spend():
+                    raise
+                await asyncio.sleep(self.RETRY_BACKOFF * (2 ** attempt) * random.uniform(0.5, 1.0))
+
+    def _parse_product_data(self, product: Dict, barcode: str, source: str) -> Dict[str, Any]:
+        return {
+            "success": True,
+            "source": source,
+            "barcode": product.get("code", barcode),
+            "product_name": product.get("product_name", "Unknown"),
+            "brands": product.get("brands", "Unknown"),
+            "ingredients_text": product.get("ingredients_text", ""),
+            "ingredients_list": product.get("ingredients_tags", []),
+        }
+
+    def _remember_product(self, barcode: str, result: Dict[str, Any]):
+        products = self.state.products
+        products[barcode] = result
+        products.move_to_end(barcode)
+        while len(products) > self.PRODUCT_CACHE_SIZE:
+            products.popitem(last=False)
+
+    async def get_product_by_barcode(self, barcode: str) -> Dict[str, Any]:
+        """
+        Fetch cosmetic product by barcode
+        If the beauty endpoint is slower than its p95 or fails, the universal
+        endpoint is raced against it and the first valid answer wins
+        """
+        sources = {
+            "beauty": ("Open Beauty Facts", f"{self.BASE_URL}/product/{barcode}.json", None),
+            "universal": ("Open Food Facts", f"{self.UNIVERSAL_SCAN_URL}/{barcode}.json", {"product_type": "all"}),
+        }
+        self.state.retry_budget.record_request()
+
+        def launch(upstream):
+            _, url, params = sources[upstream]
+            task = asyncio.create_task(self._fetch(upstream, url, params))
+            tasks[task] = upstream
+            return task
+
+        tasks: Dict[asyncio.Task, str] = {}
+        pending = {launch("beauty")}
+        hedged = False
+        not_found = False
+        error: Optional[Exception] = None
+
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=None if hedged else self.state.latency["beauty"].hedge_delay(),
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    try:
+                        data = task.result()
+                    except (CircuitOpenError, httpx.HTTPError, ValueError) as e:
+                        error = e
+                        continue
+                    if data.get("status") == 1:
+                        result = self._parse_product_data(data.get("product", {}), barcode, sources[tasks[task]][0])
+                        self._remember_product(barcode, result)
+                        return result
+                    not_found = True
+
+                if not hedged:
+                    # A slow primary only gets a backup if the budget allows;
+                    # a finished-but-unsuccessful primary always fails over
+                    if done or self.state.retry_budget.try_spend():
+                        hedged = True
+                        pending.add(launch("universal"))
+        finally:
+            for task in pending:
+                task.cancel()
+
+        if not_found:
+            return {"success": False, "error": "Product not found"}
+        if barcode in self.state.products:
+            return {**self.state.products[barcode], "stale": True}
+        return {"success": False, "error": f"API request failed: {str(error)}"}
 
     async def universal_scan(self, barcode: str) -> Dict[str, Any]:
         """Auto-detect product type"""
-        url = f"https://world.openfoodfacts.org/api/v2/product/{barcode}.json"
+        url = f"{self.UNIVERSAL_SCAN_URL}/{barcode}.json"
+        self.state.retry_budget.record_request()
+
+        try:
+            data = await self._fetch("universal", url, {"product_type": "all"})
+        except (CircuitOpenError, httpx.HTTPError, ValueError) as e:
+            return {"success": False, "error": f"Universal scan failed: {str(e)}"}
+
+        if data.get("status") == 1:
+            product = data.get("product", {})
+            return {
+                "success": True,
+                "detected_type": product.get("product_type", "unknown"),
+                "data": {
+                    "product_name": product.get("product_name", "Unknown"),
+                    "brands": product.get("brands", "Unknown"),
+                    "ingredients_text": product.get("ingredients_text", "")
+                }
+            }
+        else:
+            return {"success": False, "error": "Product not found"}
 
-        async with httpx.AsyncClient() as client:
+    def load_taxonomy_snapshot(self) -> Optional[Dict[str, Any]]:
+        """Read the on-disk taxonomy snapshot, if one has been saved"""
+        try:
+            with gzip.open(self.TAXONOMY_SNAPSHOT, "rt", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save_taxonomy_snapshot(self, snapshot: Dict[str, Any]) -> None:
+        self.TAXONOMY_SNAPSHOT.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.TAXONOMY_SNAPSHOT.with_suffix(".tmp")
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump(snapshot, f)
+        tmp.replace(self.TAXONOMY_SNAPSHOT)
+
+    async def get_ingredient_taxonomy(self) -> Dict[str, Any]:
+        """
+        Get the list of known cosmetic ingredients
+        Served from the on-disk snapshot while it is fresh, otherwise
+        revalidated with a conditional GET so unchanged data is not re-downloaded
+        Sets taxonomy_fetched_at to when the returned data was last confirmed
+        upstream, which stays old when a stale snapshot is served as fallback
+        """
+        snapshot = await asyncio.to_thread(self.load_taxonomy_snapshot)
+        self.taxonomy_fetched_at = snapshot["fetched_at"] if snapshot else 0.0
+        if snapshot and time.time() - snapshot["fetched_at"] < self.TAXONOMY_MAX_AGE:
+            return snapshot["taxonomy"]
+
+        headers = {"User-Agent": self.USER_AGENT}
+        if snapshot and snapshot.get("etag"):
+            headers["If-None-Match"] = snapshot["etag"]
+
+        async with httpx.AsyncClient(transport=self.transport) as client:
             try:
                 response = await client.get(
-                    url,
-                    params={"product_type": "all"},
-                    headers={"User-Agent": self.USER_AGENT},
-                    timeout=10.0
+                    self.TAXONOMY_URL,
+                    headers=headers,
+                    timeout=30.0,
+                    follow_redirects=True
                 )
-                data = response.json()
-
-                if data.get("status") == 1:
-                    product = data.get("product", {})
-                    return {
-                        "success": True,
-                        "detected_type": product.get("product_type", "unknown"),
-                        "data": {
-                            "product_name": product.get("product_name", "Unknown"),
-                            "brands": product.get("brands", "Unknown"),
-                            "ingredients_text": product.get("ingredients_text", "")
-                        }
-                    }
+                if response.status_code == 304 and snapshot:
+                    snapshot["fetched_at"] = time.time()
                 else:
-                    return {"success": False, "error": "Product not found"}
-            except Exception as e:
-                return {"success": False, "error": f"Universal scan failed: {str(e)}"}
+                    response.raise_for_status()
+                    snapshot = {
+                        "etag": response.headers.get("ETag"),
+                        "fetched_at": time.time(),
+                        "taxonomy": response.json()
+                    }
+                await asyncio.to_thread(self._save_taxonomy_snapshot, snapshot)
+                self.taxonomy_fetched_at = snapshot["fetched_at"]
+                return snapshot["taxonomy"]
+            except (httpx.HTTPError, ValueError) as e:
+                # Stale data beats no data for autocomplete
+                if snapshot:
+                    return snapshot["taxonomy"]
+                return {"error": str(e)}
@@ -0,0 +1,115 @@
+"""
+Resilience primitives for upstream API calls
+Adaptive timeouts, circuit breaking and retry budgets shared across requests
+"""
+from collections import deque
+from typing import Optional
+import time
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit is open"""
+
+class LatencyTracker:
+    """
+    Rolling window of response times, used to size timeouts
+    Cancelled and timed-out calls are recorded too, as lower bounds
+    """
+
+    def __init__(self, window: int = 200, min_samples: int = 20,
+                 default_timeout: float = 10.0, min_timeout: float = 1.0,
+                 max_timeout: float = 10.0):
+        self.samples = deque(maxlen=window)
+        self.min_samples = min_samples
+        self.default_timeout = default_timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Return the p-th percentile (0-100), or None until enough samples exist"""
+        if len(self.samples) < self.min_samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+    def timeout(self) -> float:
+        """A few times p99, clamped so one slow tail can't stretch it unbounded"""
+        p99 = self.percentile(99)
+        if p99 is None:
+            return self.default_timeout
+        return max(self.min_timeout, min(self.max_timeout, p99 * 3))
+
+    def hedge_delay(self) -> float:
+        """How long to wait on the primary before racing a backup request"""
+        p95 = self.percentile(95)
+        if p95 is None:
+            return self.default_timeout / 4
+        return p95
+
+class CircuitBreaker:
+    """
+    Closed -> open after consecutive failures; open -> half-open after a
+    cool-down, where a single trial request decides whether to close again
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = self.HALF_OPEN
+            self._trial_in_flight = False
+        if self.state == self.HALF_OPEN:
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+        return True
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self._trial_in_flight = False
+
+    def record_cancelled(self):
+        """A call abandoned by its caller says nothing about upstream health"""
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+        self._trial_in_flight = False
+
+class RetryBudget:
+    """
+    Token bucket limiting retries and hedges to a fraction of live traffic,
+    so a struggling upstream isn't hit with a multiple of the normal load
+    """
+
+    def __init__(self, ratio: float = 0.2, min_tokens: float = 3.0, max_tokens: float = 20.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = min_tokens
+
+    def record_request(self):
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
@@ -0,0 +1,104 @@
+"""
+Push updates for the sentiment dashboard
+One shared producer watches the results file and fans deltas out to subscribers
+"""
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Set
+import asyncio
+
+class Subscriber:
+    """A single dashboard connection with a bounded outgoing buffer"""
+
+    def __init__(self, max_buffer: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_buffer)
+        # Set when deltas were dropped, so the next event must be a full snapshot
+        self.needs_snapshot = False
+
+    def offer(self, event: Dict[str, Any]):
+        if self.needs_snapshot:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Slow consumer: discard its backlog rather than let it grow,
+            # and resync it with a snapshot once it catches up
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.needs_snapshot = True
+            self.queue.put_nowait({"event": "resync"})
+
+class SummaryBroadcaster:
+    """
+    Recomputes the summary only when the watched file changes, debounces
+    bursts of writes into one update and sends each subscriber only the
+    top-level fields that changed
+    """
+
+    def __init__(self, path: Path, load_summary: Callable[[], Optional[Dict[str, Any]]],
+                 poll_interval: float = 1.0, debounce: float = 0.5, max_buffer: int = 16):
+        self.path = path
+        self.load_summary = load_summary
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.max_buffer = max_buffer
+        self.subscribers: Set[Subscriber] = set()
+        self.summary: Optional[Dict[str, Any]] = None
+        self._stamp = None
+        self._producer: Optional[asyncio.Task] = None
+
+    def _file_stamp(self):
+        try:
+            stat = self.path.stat()
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+
+    async def _refresh(self) -> Optional[Dict[str, Any]]:
+        """Reload the summary and return the changed fields, if any"""
+        try:
+            summary = await asyncio.to_thread(self.load_summary)
+        except Exception as e:
+            # Typically the file caught mid-rewrite: keep the last good summary
+            # and forget the stamp so the next poll tries again
+            print(f"Error reloading sentiment summary: {e}")
+            self._stamp = None
+            return None
+        if summary is None or summary == self.summary:
+            return None
+        previous = self.summary or {}
+        self.summary = summary
+        return {key: value for key, value in summary.items() if previous.get(key) != value}
+
+    async def _produce(self):
+        while self.subscribers:
+            await asyncio.sleep(self.poll_interval)
+            stamp = self._file_stamp()
+            if stamp == self._stamp:
+                continue
+
+            # Wait for the writer to settle so a burst becomes one update
+            while True:
+                await asyncio.sleep(self.debounce)
+                settled = self._file_stamp()
+                if settled == stamp:
+                    break
+                stamp = settled
+            self._stamp = stamp
+
+            delta = await self._refresh()
+            if delta:
+                for subscriber in list(self.subscribers):
+                    subscriber.offer({"event": "delta", "data": delta})
+
+    async def subscribe(self) -> Subscriber:
+        if self.summary is None:
+            self._stamp = self._file_stamp()
+            await self._refresh()
+        subscriber = Subscriber(self.max_buffer)
+        self.subscribers.add(subscriber)
+        if self._producer is None or self._producer.done():
+            self._producer = asyncio.create_task(self._produce())
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self.subscribers.discard(subscriber)
@@ -0,0 +1,376 @@
+"""
+Ingredient-set Similarity Index for "safer alternative" search
+MinHash signatures bucketed with LSH, stored as memory-mapped numpy arrays
+
+On disk the index is an immutable base (sorted band keys per LSH band,
+searched with binary search straight from the memory map) plus an
+append-only log of products inserted since the base was written. The log
+is replayed into memory on load and folded into the base by compact(),
+which add() starts in a background thread once the log grows past
+COMPACT_THRESHOLD entries.
+
+Bulk import from an Open Beauty Facts JSONL export:
+
+    python -m app.services.similarity_index products.jsonl
+"""
+from pathlib import Path
+from typing import Dict, List, Any, Iterable, Optional
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+
+from app.services.ingredient_index import normalize_ingredient
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+# Large buckets (e.g. products listing only "aqua") are sampled, not scanned:
+# at most this many rows, spread evenly across the bucket from the newest
+MAX_BUCKET = 256
+# Logged inserts beyond this are folded into the base in the background
+COMPACT_THRESHOLD = 10000
+# Minimum fixed width of the on-disk barcode column; longer codes widen it
+BARCODE_WIDTH = 24
+NAME_WIDTH = 96
+
+_PRIME = (1 << 31) - 1
+_rng = np.random.RandomState(20240601)
+_HASH_A = _rng.randint(1, _PRIME, size=NUM_PERM).astype(np.uint64)
+_HASH_B = _rng.randint(0, _PRIME, size=NUM_PERM).astype(np.uint64)
+_BAND_MULT = _rng.randint(1, 1 << 62, size=ROWS, dtype=np.int64).astype(np.uint64) | np.uint64(1)
+
+def _token_hash(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=4).digest(), "little") % _PRIME
+
+def minhash_signature(ingredients: Iterable[str]) -> Optional[np.ndarray]:
+    """MinHash signature of a normalized ingredient set, or None if it is empty"""
+    tokens = {normalize_ingredient(i) for i in ingredients}
+    tokens.discard("")
+    if not tokens:
+        return None
+    hashes = np.array([_token_hash(t) for t in tokens], dtype=np.uint64)
+    permuted = (np.outer(hashes, _HASH_A) + _HASH_B) % np.uint64(_PRIME)
+    return permuted.min(axis=0).astype(np.uint32)
+
+def _bucket_sample(start: int, end: int) -> np.ndarray:
+    """Positions in [start, end), at most MAX_BUCKET of them, evenly strided from the end"""
+    step = max(1, -(-(end - start) // MAX_BUCKET))
+    return np.arange(end - 1, start - 1, -step)
+
+def band_keys(signatures: np.ndarray) -> np.ndarray:
+    """Collapse each band of ROWS hash values into one uint64 key, shape (n, BANDS)"""
+    bands = signatures.astype(np.uint64).reshape(len(signatures), BANDS, ROWS)
+    with np.errstate(over="ignore"):
+        return (bands * _BAND_MULT).sum(axis=2)
+
+class SimilarityIndex:
+    """
+    MinHash/LSH index over product ingredient sets
+
+    Safe to use from the event loop while a background compaction runs:
+    lookups and inserts hold a lock only briefly, and the new base is
+    built from a snapshot outside it.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else Path("../data/similarity")
+        self._lock = threading.RLock()
+        self._compacting = False
+        self._load_base()
+        self._reset_delta()
+        self._replay_log()
+
+    # ---------- persistence ----------
+
+    def _recover_base(self):
+        """Finish a base swap that a crash interrupted during compact()"""
+        base = self.path / "base"
+        if base.exists():
+            return
+        # base.old is the previous complete base; base.tmp only counts once
+        # compact() has marked it complete
+        old, tmp = self.path / "base.old", self.path / "base.tmp"
+        if old.exists():
+            os.replace(old, base)
+        elif (tmp / "COMPLETE").exists():
+            os.replace(tmp, base)
+
+    def _load_base(self):
+        base = self.path / "base"
+        self._recover_base()
+        if (base / "signatures.npy").exists():
+            self.signatures = np.load(base / "signatures.npy", mmap_mode="r")
+            self.scores = np.load(base / "scores.npy", mmap_mode="r")
+            self.sorted_keys = np.load(base / "band_keys.npy", mmap_mode="r")
+            self.sorted_rows = np.load(base / "band_rows.npy", mmap_mode="r")
+            self.barcodes = np.load(base / "barcodes.npy", mmap_mode="r")
+            self.barcode_order = np.load(base / "barcode_order.npy", mmap_mode="r")
+            self.names = np.load(base / "names.npy", mmap_mode="r")
+        else:
+            self.signatures = np.zeros((0, NUM_PERM), dtype=np.uint32)
+            self.scores = np.zeros(0, dtype=np.float32)
+            self.sorted_keys = np.zeros((BANDS, 0), dtype=np.uint64)
+            self.sorted_rows = np.zeros((BANDS, 0), dtype=np.int64)
+            self.barcodes = np.zeros(0, dtype=f"S{BARCODE_WIDTH}")
+            self.barcode_order = np.zeros(0, dtype=np.int64)
+            self.names = np.zeros(0, dtype=f"S{NAME_WIDTH}")
+
+    def _reset_delta(self):
+        # Products inserted since the base was written. Rows are append-only;
+        # delta_rows points each barcode at its newest row, older rows are dead
+        self.delta_signatures: List[np.ndarray] = []
+        self.delta_products: List[Dict[str, Any]] = []
+        self.delta_rows: Dict[str, int] = {}
+        self.delta_buckets: List[Dict[int, List[int]]] = [{} for _ in range(BANDS)]
+
+    def _replay_log(self):
+        # A log left behind by an interrupted compaction is older than the live one
+        for name in ("inserts.compacting.jsonl", "inserts.jsonl"):
+            log = self.path / name
+            if not log.exists():
+                continue
+            with open(log, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._add_to_delta(entry, minhash_signature(entry["ingredients"]))
+        self._maybe_compact()
+
+    def _maybe_compact(self):
+        if len(self.delta_products) <= COMPACT_THRESHOLD or self._compacting:
+            return
+        self._compacting = True
+        threading.Thread(target=self._compact_in_background, daemon=True).start()
+
+    def _compact_in_background(self):
+        try:
+            self.compact()
+        except Exception as e:
+            # The logs are still intact, so the next attempt starts from them
+            print(f"Similarity index compaction failed: {e}")
+        finally:
+            self._compacting = False
+
+    def _rotate_log(self):
+        """Move the live log aside so inserts made during compaction start a fresh one"""
+        live = self.path / "inserts.jsonl"
+        compacting = self.path / "inserts.compacting.jsonl"
+        if not live.exists():
+            return
+        if compacting.exists():
+            with open(compacting, "a", encoding="utf-8") as out, open(live, encoding="utf-8") as f:
+                shutil.copyfileobj(f, out)
+            live.unlink()
+        else:
+            os.replace(live, compacting)
+
+    def compact(self):
+        """Merge logged inserts into a new base and drop the folded-in log"""
+        with self._lock:
+            count = len(self.delta_products)
+            newest = {barcode: row for barcode, row in self.delta_rows.items() if row < count}
+            rows = sorted(newest.values())
+            products = [self.delta_products[row] for row in rows]
+            delta_signatures = [self.delta_signatures[row] for row in rows]
+            live = self._live_base_rows(newest)
+            base = (self.signatures, self.scores, self.barcodes, self.names)
+            self._rotate_log()
+
+        old_signatures, old_scores, old_barcodes, old_names = base
+        width = max([BARCODE_WIDTH, old_barcodes.dtype.itemsize] + [len(p["barcode"].encode()) for p in products])
+        signatures = np.concatenate([old_signatures[live], np.array(delta_signatures, dtype=np.uint32).reshape(-1, NUM_PERM)])
+        scores = np.concatenate([old_scores[live], np.array([p["safety_score"] for p in products], dtype=np.float32)])
+        barcodes = np.concatenate([
+            old_barcodes[live].astype(f"S{width}"),
+            np.array([p["barcode"].encode() for p in products], dtype=f"S{width}")
+        ])
+        names = np.concatenate([
+            old_names[live],
+            np.array([p["product_name"].encode()[:NAME_WIDTH] for p in products], dtype=f"S{NAME_WIDTH}")
+        ])
+
+        keys = band_keys(signatures).T
+        order = np.argsort(keys, axis=1, kind="stable")
+
+        tmp = self.path / "base.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        np.save(tmp / "signatures.npy", signatures)
+        np.save(tmp / "scores.npy", scores)
+        np.save(tmp / "band_keys.npy", np.take_along_axis(keys, order, axis=1))
+        np.save(tmp / "band_rows.npy", order)
+        np.save(tmp / "barcodes.npy", barcodes)
+        np.save(tmp / "barcode_order.npy", np.argsort(barcodes, kind="stable"))
+        np.save(tmp / "names.npy", names)
+        (tmp / "COMPLETE").touch()
+
+        with self._lock:
+            old = self.path / "base.old"
+            shutil.rmtree(old, ignore_errors=True)
+            if (self.path / "base").exists():
+                os.replace(self.path / "base", old)
+            os.replace(tmp, self.path / "base")
+            shutil.rmtree(old, ignore_errors=True)
+            (self.path / "inserts.compacting.jsonl").unlink(missing_ok=True)
+            self._load_base()
+
+            # Keep only what was inserted while the new base was being built
+            later = [
+                (self.delta_products[row], self.delta_signatures[row])
+                for row in range(count, len(self.delta_products))
+                if self.delta_rows[self.delta_products[row]["barcode"]] == row
+            ]
+            self._reset_delta()
+            for product, signature in later:
+                self._add_to_delta(product, signature)
+
+    def _live_base_rows(self, superseded: Iterable[str]) -> np.ndarray:
+        """Base rows not superseded by a newer insert of the same barcode"""
+        live = np.ones(len(self.barcodes), dtype=bool)
+        for barcode in superseded:
+            row = self._base_row(barcode)
+            if row is not None:
+                live[row] = False
+        return live
+
+    # ---------- inserts and lookups ----------
+
+    def __len__(self) -> int:
+        with self._lock:
+            return int(self._live_base_rows(self.delta_rows).sum()) + len(self.delta_rows)
+
+    def _base_row(self, barcode: str) -> Optional[int]:
+        key = barcode.encode()
+        if len(key) > self.barcodes.dtype.itemsize:
+            return None
+        position = np.searchsorted(self.barcodes, key, sorter=self.barcode_order)
+        if position < len(self.barcode_order) and self.barcodes[self.barcode_order[position]] == key:
+            return int(self.barcode_order[position])
+        return None
+
+    def _add_to_delta(self, product: Dict[str, Any], signature: Optional[np.ndarray]):
+        if signature is None:
+            return
+        row = len(self.delta_products)
+        self.delta_rows[product["barcode"]] = row
+        self.delta_signatures.append(signature)
+        self.delta_products.append(product)
+        for band, key in enumerate(band_keys(signature[None, :])[0]):
+            self.delta_buckets[band].setdefault(int(key), []).append(row)
+
+    def add(self, barcode: str, ingredients: List[str], product_name: str, safety_score: float) -> bool:
+        """Insert or replace a product; returns False when it has no usable ingredients"""
+        signature = minhash_signature(ingredients)
+        if signature is None:
+            return False
+        product = {
+            "barcode": barcode,
+            "product_name": product_name or "Unknown",
+            "safety_score": float(safety_score),
+            "ingredients": list(ingredients)
+        }
+        with self._lock:
+            self._add_to_delta(product, signature)
+            self.path.mkdir(parents=True, exist_ok=True)
+            with open(self.path / "inserts.jsonl", "a", encoding="utf-8") as f:
+                f.write(json.dumps(product) + "\n")
+            self._maybe_compact()
+        return True
+
+    def get(self, barcode: str) -> Optional[Dict[str, Any]]:
+        """Stored signature, name and score for a barcode"""
+        with self._lock:
+            if barcode in self.delta_rows:
+                row = self.delta_rows[barcode]
+                product = self.delta_products[row]
+                return {**product, "signature": self.delta_signatures[row]}
+            row = self._base_row(barcode)
+            if row is None:
+                return None
+            return {
+                "barcode": barcode,
+                "product_name": self.names[row].decode("utf-8", "ignore"),
+                "safety_score": float(self.scores[row]),
+                "signature": np.asarray(self.signatures[row])
+            }
+
+    def similar(self, signature: np.ndarray, limit: int = 10, min_similarity: float = 0.3,
+                min_score: Optional[float] = None, exclude: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Products whose estimated Jaccard similarity to signature is at least min_similarity"""
+        keys = band_keys(signature[None, :])[0]
+        results = []
+
+        with self._lock:
+            base_rows = set()
+            for band, key in enumerate(keys):
+                band_keys_sorted = self.sorted_keys[band]
+                start = np.searchsorted(band_keys_sorted, key, side="left")
+                end = np.searchsorted(band_keys_sorted, key, side="right")
+                base_rows.update(self.sorted_rows[band][_bucket_sample(start, end)].tolist())
+            if base_rows:
+                rows = np.fromiter(sorted(base_rows), dtype=np.int64)
+                similarity = (self.signatures[rows] == signature).mean(axis=1)
+                for row, sim in zip(rows, similarity):
+                    barcode = self.barcodes[row].decode()
+                    if barcode == exclude or barcode in self.delta_rows:
+                        continue
+                    results.append({
+                        "barcode": barcode,
+                        "product_name": self.names[row].decode("utf-8", "ignore"),
+                        "safety_score": float(self.scores[row]),
+                        "similarity": float(sim)
+                    })
+
+            delta_rows = set()
+            for band, key in enumerate(keys):
+                bucket = self.delta_buckets[band].get(int(key), [])
+                delta_rows.update(bucket[i] for i in _bucket_sample(0, len(bucket)))
+            for row in delta_rows:
+                product = self.delta_products[row]
+                if product["barcode"] == exclude or self.delta_rows[product["barcode"]] != row:
+                    continue
+                results.append({
+                    "barcode": product["barcode"],
+                    "product_name": product["product_name"],
+                    "safety_score": product["safety_score"],
+                    "similarity": float((self.delta_signatures[row] == signature).mean())
+                })
+
+        results = [
+            r for r in results
+            if r["similarity"] >= min_similarity and (min_score is None or r["safety_score"] > min_score)
+        ]
+        results.sort(key=lambda r: (-r["similarity"], -r["safety_score"]))
+        return results[:limit]
+
+if __name__ == "__main__":
+    import sys
+    from app.api.ocr import score_ingredients
+
+    if len(sys.argv) < 2:
+        print("Usage: python -m app.services.similarity_index <products.jsonl>")
+        sys.exit(1)
+
+    index = SimilarityIndex()
+    imported = 0
+    with open(sys.argv[1], encoding="utf-8") as f:
+        for line in f:
+            product = json.loads(line)
+            ingredients = product.get("ingredients_tags") or []
+            if not product.get("code") or not ingredients:
+                continue
+            results = score_ingredients(ingredients)["results"]
+            score = sum(r["safety_score"] for r in results) / len(results)
+            index._add_to_delta({
+                "barcode": str(product["code"]),
+                "product_name": product.get("product_name") or "Unknown",
+                "safety_score": score,
+                "ingredients": ingredients
+            }, minhash_signature(ingredients))
+            imported += 1
+    index.compact()
+    print(f"✅ Imported {imported} products, index now holds {len(index)}")
@@ -0,0 +1,100 @@
+"""
+Fault-injecting stand-in for the Open Beauty Facts / Open Food Facts APIs
+Lets the client's timeouts, hedging and circuit breaker be exercised offline:
+
+    python -m app.utils.fault_stub
+"""
+import httpx
+from typing import Dict, Any, Optional
+import asyncio
+import random
+import time
+
+class FaultInjectingTransport(httpx.AsyncBaseTransport):
+    """httpx transport that answers product lookups locally with injected faults"""
+
+    def __init__(self, products: Dict[str, Dict[str, Any]], seed: Optional[int] = None):
+        self.products = products
+        self.random = random.Random(seed)
+        # Per-upstream fault settings, keyed by "beauty" / "universal"
+        self.faults = {
+            "beauty": {"latency": 0.02, "slow_rate": 0.0, "slow_latency": 2.0, "error_rate": 0.0, "down": False},
+            "universal": {"latency": 0.03, "slow_rate": 0.0, "slow_latency": 2.0, "error_rate": 0.0, "down": False},
+        }
+        self.calls = {"beauty": 0, "universal": 0}
+
+    def configure(self, upstream: str, **settings):
+        self.faults[upstream].update(settings)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        upstream = "beauty" if "openbeautyfacts" in request.url.host else "universal"
+        faults = self.faults[upstream]
+        self.calls[upstream] += 1
+
+        if faults["down"]:
+            raise httpx.ConnectError("injected outage", request=request)
+
+        slow = self.random.random() < faults["slow_rate"]
+        await asyncio.sleep(faults["slow_latency"] if slow else faults["latency"])
+
+        if self.random.random() < faults["error_rate"]:
+            return httpx.Response(503, json={"status": 0}, request=request)
+
+        barcode = request.url.path.rsplit("/", 1)[-1].removesuffix(".json")
+        product = self.products.get(barcode)
+        if product is None:
+            return httpx.Response(404, json={"status": 0, "status_verbose": "product not found"}, request=request)
+        return httpx.Response(200, json={"status": 1, "product": product}, request=request)
+
+async def _timed_lookups(client, barcode: str, count: int):
+    timings = []
+    result = None
+    for _ in range(count):
+        started = time.perf_counter()
+        result = await client.get_product_by_barcode(barcode)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return result, timings[len(timings) // 2], timings[int(len(timings) * 0.95)]
+
+async def main():
+    from app.services.openbeautyfacts import OpenBeautyFactsClient, UpstreamState
+
+    barcode = "3337875597210"
+    transport = FaultInjectingTransport({
+        barcode: {
+            "code": barcode,
+            "product_name": "Hydrating Cleanser",
+            "brands": "CeraVe",
+            "ingredients_text": "Aqua, Glycerin",
+            "ingredients_tags": ["en:aqua", "en:glycerin"]
+        }
+    }, seed=42)
+    state = UpstreamState()
+    client = OpenBeautyFactsClient(transport=transport, state=state)
+
+    print("=" * 60)
+    print("OPEN BEAUTY FACTS RESILIENCE CHECK (offline stub)")
+    print("=" * 60)
+
+    result, p50, p95 = await _timed_lookups(client, barcode, 40)
+    print(f"Healthy:           p50={p50*1000:.0f}ms p95={p95*1000:.0f}ms source={result.get('source')}")
+
+    missing = await client.get_product_by_barcode("0000000000000")
+    print(f"Unknown barcode:   {missing}")
+
+    transport.configure("beauty", slow_rate=0.2)
+    result, p50, p95 = await _timed_lookups(client, barcode, 40)
+    print(f"20% slow beauty:   p50={p50*1000:.0f}ms p95={p95*1000:.0f}ms (hedged to universal)")
+
+    transport.configure("beauty", slow_rate=0.0, down=True)
+    result, p50, p95 = await _timed_lookups(client, barcode, 20)
+    print(f"Beauty outage:     p50={p50*1000:.0f}ms breaker={state.breakers['beauty'].state} source={result.get('source')}")
+
+    transport.configure("universal", down=True)
+    before = dict(transport.calls)
+    result, p50, p95 = await _timed_lookups(client, barcode, 20)
+    upstream_calls = sum(transport.calls.values()) - sum(before.values())
+    print(f"Full outage:       p50={p50*1000:.1f}ms stale={result.get('stale', False)} upstream calls={upstream_calls}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
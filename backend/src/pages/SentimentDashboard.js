@@ -10,6 +10,18 @@ const SentimentDashboard = () => {
 
   useEffect(() => {
     checkApiAndFetchData();
+
+    // Live updates: a full snapshot on connect, then only the changed fields
+    const events = new EventSource('http://localhost:8000/api/sentiment/stream');
+    events.addEventListener('snapshot', (e) => {
+      setData(JSON.parse(e.data));
+    });
+    events.addEventListener('delta', (e) => {
+      const changes = JSON.parse(e.data);
+      setData((prev) => ({ ...prev, success: true, data: { ...prev?.data, ...changes } }));
+    });
+
+    return () => events.close();
   }, []);
 
   const checkApiAndFetchData = async () => {
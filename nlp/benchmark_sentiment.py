@@ -0,0 +1,74 @@
+"""
+Throughput benchmark: VADER vs the ONNX transformer backend
+Run from the repo root:
+
+    python nlp/benchmark_sentiment.py [model_dir]
+
+model_dir (or SENTIMENT_ONNX_MODEL) is a local directory with model.onnx
+and tokenizer.json; without it only VADER is measured.
+"""
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+try:
+    from nlp.sentiment_backends import VaderBackend, OnnxTransformerBackend, MicroBatcher
+except ImportError:  # run as a script from inside nlp/
+    from sentiment_backends import VaderBackend, OnnxTransformerBackend, MicroBatcher
+
+REPEAT = 50
+CLIENTS = 16
+
+def label_accuracy(df, scores):
+    """Agreement with star ratings: 4-5 positive, 1-2 negative, 3 skipped"""
+    hits = total = 0
+    for rating, score in zip(df['rating'], scores):
+        if rating == 3:
+            continue
+        total += 1
+        hits += (score >= 0.05) == (rating >= 4)
+    return hits / total if total else 0.0
+
+def sequential(backend, texts):
+    """One text per call, as a request handler without batching would do"""
+    started = time.perf_counter()
+    for text in texts:
+        backend.score(text)
+    return len(texts) / (time.perf_counter() - started)
+
+def concurrent(backend, texts):
+    """CLIENTS threads each scoring single texts, as concurrent API requests would"""
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=CLIENTS) as pool:
+        list(pool.map(backend.score, texts))
+    return len(texts) / (time.perf_counter() - started)
+
+if __name__ == "__main__":
+    df = pd.read_csv('data/reviews/sample_reviews.csv')
+    texts = df['text'].tolist() * REPEAT
+    model_dir = sys.argv[1] if len(sys.argv) > 1 else os.environ.get("SENTIMENT_ONNX_MODEL")
+
+    print("=" * 60)
+    print(f"SENTIMENT BACKEND BENCHMARK ({len(texts)} texts, {CLIENTS} clients)")
+    print("=" * 60)
+
+    vader = VaderBackend()
+    print(f"VADER sequential:        {sequential(vader, texts):8.0f} texts/s  "
+          f"accuracy {label_accuracy(df, vader.score_batch(df['text'].tolist())):.0%}")
+
+    if not model_dir:
+        print("\nNo model_dir given - skipping the transformer backend")
+        sys.exit(0)
+
+    onnx = OnnxTransformerBackend(model_dir)
+    print(f"ONNX sequential:         {sequential(onnx, texts):8.0f} texts/s  "
+          f"accuracy {label_accuracy(df, onnx.score_batch(df['text'].tolist())):.0%}")
+    print(f"ONNX concurrent:         {concurrent(onnx, texts):8.0f} texts/s")
+
+    batcher = MicroBatcher(onnx)
+    print(f"ONNX micro-batched:      {concurrent(batcher, texts):8.0f} texts/s  "
+          f"avg batch {batcher.batched_texts / max(batcher.batches, 1):.1f}")
+    batcher.close()
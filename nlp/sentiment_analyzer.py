@@ -4,16 +4,21 @@ Sentiment Analysis for Cosmetic Reviews
 import nltk
 import pandas as pd
 import numpy as np
-from nltk.sentiment import SentimentIntensityAnalyzer
 import glob
 import json
 import os
 from collections import Counter
 from datetime import datetime
 
+try:
+    from nlp.sentiment_backends import VaderBackend, OnnxTransformerBackend
+except ImportError:  # run as a script from inside nlp/
+    from sentiment_backends import VaderBackend, OnnxTransformerBackend
+
 class CosmeticSentimentAnalyzer:
-    def __init__(self):
-        self.sia = SentimentIntensityAnalyzer()
+    def __init__(self, backend=None):
+        # Any SentimentBackend; VADER unless told otherwise
+        self.backend = backend or VaderBackend()
         
         # Issue keywords
         self.issue_keywords = {
@@ -26,9 +31,9 @@ class CosmeticSentimentAnalyzer:
     
     def analyze_sentiment(self, text):
         """Get sentiment score (-1 to 1)"""
-        scores = self.sia.polarity_scores(text)
-        compound = scores['compound']
-        
+        return self._label(self.backend.score(text))
+    
+    def _label(self, compound):
         if compound >= 0.05:
             sentiment = 'positive'
         elif compound <= -0.05:
@@ -53,13 +58,15 @@ class CosmeticSentimentAnalyzer:
     def analyze_reviews(self, df):
         """Analyze all reviews"""
         results = []
+        rows = [row for _, row in df.iterrows()
+                if row.get('text', '') and len(row.get('text', '')) >= 20]
         
-        for _, row in df.iterrows():
-            text = row.get('text', '')
-            if not text or len(text) < 20:
-                continue
-            
-            sentiment, score = self.analyze_sentiment(text)
+        # Score everything in one call so batching backends see full batches
+        scores = self.backend.score_batch([row['text'] for row in rows])
+        
+        for row, compound in zip(rows, scores):
+            text = row['text']
+            sentiment, score = self._label(compound)
             issues = self.extract_issues(text)
             
             results.append({
@@ -92,7 +99,9 @@ class CosmeticSentimentAnalyzer:
         return report
 
 if __name__ == "__main__":
-    analyzer = CosmeticSentimentAnalyzer()
+    # Point SENTIMENT_ONNX_MODEL at a local model directory to use the transformer backend
+    model_dir = os.environ.get("SENTIMENT_ONNX_MODEL")
+    analyzer = CosmeticSentimentAnalyzer(OnnxTransformerBackend(model_dir) if model_dir else None)
     
     # Find latest review file
     review_files = glob.glob("data/reviews/amazon_reviews_*.csv")
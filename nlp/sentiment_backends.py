@@ -0,0 +1,216 @@
+"""
+Pluggable scoring backends for CosmeticSentimentAnalyzer
+Every backend maps texts to a compound score in [-1, 1]
+
+The transformer backend needs the optional packages onnxruntime and
+tokenizers, plus a local model directory holding model.onnx (ideally
+quantized), tokenizer.json and optionally config.json.
+"""
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List
+
+import numpy as np
+
+# Queue sentinel that tells the batching thread to drain and stop
+_CLOSE = object()
+
+class SentimentBackend:
+    """Interface for sentiment scoring backends"""
+
+    name = "base"
+
+    def score_batch(self, texts: List[str]) -> List[float]:
+        """Return one compound score in [-1, 1] per text"""
+        raise NotImplementedError
+
+    def score(self, text: str) -> float:
+        return self.score_batch([text])[0]
+
+class VaderBackend(SentimentBackend):
+    """NLTK VADER lexicon scoring - the default"""
+
+    name = "vader"
+
+    def __init__(self):
+        from nltk.sentiment import SentimentIntensityAnalyzer
+        self.sia = SentimentIntensityAnalyzer()
+
+    def score_batch(self, texts):
+        return [self.sia.polarity_scores(text)['compound'] for text in texts]
+
+class OnnxTransformerBackend(SentimentBackend):
+    """
+    Sequence-classification transformer run with ONNX Runtime on CPU
+    The compound score is P(positive) - P(negative)
+    """
+
+    name = "onnx"
+
+    def __init__(self, model_dir, max_length=256, num_threads=None):
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise ImportError(
+                "The transformer backend needs onnxruntime and tokenizers: "
+                "pip install onnxruntime tokenizers"
+            ) from e
+
+        model_path = os.path.join(model_dir, "model.onnx")
+        if not os.path.exists(model_path):
+            model_path = os.path.join(model_dir, "model_quantized.onnx")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        pad_token = next((t for t in ("[PAD]", "<pad>") if self.tokenizer.token_to_id(t) is not None), None)
+        pad_id = self.tokenizer.token_to_id(pad_token) if pad_token else 0
+        # Pad each batch only to its own longest text
+        self.tokenizer.enable_padding(pad_id=pad_id, pad_token=pad_token or "[PAD]")
+
+        self.negative, self.positive = self._label_indices(model_dir)
+
+    def _label_indices(self, model_dir):
+        """Find the negative/positive logits from config.json's id2label"""
+        labels = {}
+        config_path = os.path.join(model_dir, "config.json")
+        if os.path.exists(config_path):
+            with open(config_path) as f:
+                labels = {int(k): v.lower() for k, v in json.load(f).get("id2label", {}).items()}
+
+        negative = next((i for i, label in labels.items() if label.startswith("neg")), 0)
+        positive = next((i for i, label in labels.items() if label.startswith("pos")), max(labels, default=1))
+        return negative, positive
+
+    def score_batch(self, texts):
+        if not texts:
+            return []
+        encodings = self.tokenizer.encode_batch(texts)
+        feeds = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+        }
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+        feeds = {k: v for k, v in feeds.items() if k in self.input_names}
+
+        logits = self.session.run(None, feeds)[0]
+        logits = logits - logits.max(axis=1, keepdims=True)
+        probs = np.exp(logits) / np.exp(logits).sum(axis=1, keepdims=True)
+        return (probs[:, self.positive] - probs[:, self.negative]).round(4).tolist()
+
+class MicroBatcher(SentimentBackend):
+    """
+    Groups concurrent requests into batches for a wrapped backend
+
+    Texts are bucketed by word count so a batch doesn't pad short reviews
+    up to the longest one. A bucket is flushed when it reaches
+    max_batch_size or when its oldest text has waited max_wait seconds.
+    """
+
+    def __init__(self, backend, max_batch_size=32, max_wait=0.01, buckets=(16, 32, 64, 128, 256)):
+        self.backend = backend
+        self.name = f"{backend.name}+batching"
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.buckets = buckets
+        # Totals for reporting the average batch size actually achieved
+        self.batches = 0
+        self.batched_texts = 0
+        self._queue = queue.Queue()
+        # Guards _closed so nothing is queued behind the _CLOSE sentinel
+        self._lock = threading.Lock()
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def _bucket(self, text):
+        words = len(text.split())
+        return next((b for b in self.buckets if words <= b), self.buckets[-1] + 1)
+
+    def submit(self, text) -> Future:
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("MicroBatcher is closed")
+            self._queue.put((text, future, time.monotonic()))
+        return future
+
+    def score_batch(self, texts):
+        futures = [self.submit(text) for text in texts]
+        return [f.result() for f in futures]
+
+    def close(self):
+        """Score everything already submitted, then stop the batching thread"""
+        with self._lock:
+            if not self._closed:
+                self._closed = True
+                self._queue.put(_CLOSE)
+        self._worker.join()
+
+    def _flush(self, pending: Dict[int, list], bucket):
+        # Claim each future first; ones their caller already cancelled are dropped
+        batch = [item for item in pending.pop(bucket) if item[1].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        self.batches += 1
+        self.batched_texts += len(batch)
+        try:
+            scores = self.backend.score_batch([text for text, _, _ in batch])
+            if len(scores) != len(batch):
+                raise ValueError(f"{self.backend.name} returned {len(scores)} scores for {len(batch)} texts")
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+        for (_, future, _), score in zip(batch, scores):
+            future.set_result(score)
+
+    def _safe_flush(self, pending: Dict[int, list], bucket):
+        """Flush without letting one bad batch end the batching thread"""
+        batch = pending.get(bucket, [])
+        try:
+            self._flush(pending, bucket)
+        except Exception as e:
+            print(f"MicroBatcher failed to resolve a batch: {e}")
+            pending.pop(bucket, None)
+            for _, future, _ in batch:
+                if future.running():
+                    future.set_exception(e)
+
+    def _run(self):
+        pending: Dict[int, list] = {}
+        closing = False
+        while not closing or pending:
+            timeout = None
+            if pending:
+                oldest = min(batch[0][2] for batch in pending.values())
+                timeout = max(0.0, oldest + self.max_wait - time.monotonic())
+
+            if not closing:
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = None
+                if item is _CLOSE:
+                    closing = True
+                elif item is not None:
+                    bucket = self._bucket(item[0])
+                    pending.setdefault(bucket, []).append(item)
+                    if len(pending[bucket]) >= self.max_batch_size:
+                        self._safe_flush(pending, bucket)
+
+            now = time.monotonic()
+            for bucket in [b for b, batch in pending.items() if closing or batch[0][2] + self.max_wait <= now]:
+                self._safe_flush(pending, bucket)
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The FastAPI app is imported as the top-level "app" package from backend/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
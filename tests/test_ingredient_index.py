@@ -0,0 +1,74 @@
+"""
+IngredientIndex autocomplete ranking and typo tolerance
+"""
+import random
+import string
+
+import pytest
+
+import app.services.ingredient_index as ingredient_index
+from app.services.ingredient_index import IngredientIndex, normalize_ingredient
+
+COMMON = [
+    {"name": "Aqua", "synonyms": ["en:aqua", "Water", "Eau"], "products": 90000},
+    {"name": "Glycerin", "synonyms": ["en:glycerin", "Glycerol"], "products": 40000},
+    {"name": "Sodium Laureth Sulfate", "synonyms": ["en:sodium-laureth-sulfate"], "products": 20000},
+    {"name": "Sodium Chloride", "synonyms": ["en:sodium-chloride"], "products": 15000},
+]
+
+@pytest.fixture(scope="module")
+def index():
+    """A taxonomy-sized index where the real ingredients are buried in noise"""
+    rng = random.Random(7)
+    noise = [
+        {
+            "name": "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(5, 14))).capitalize(),
+            "products": rng.randint(0, 50)
+        }
+        for _ in range(30000)
+    ]
+    return IngredientIndex(noise + COMMON)
+
+def names(results):
+    return [r["name"] for r in results]
+
+def test_normalize_ingredient():
+    assert normalize_ingredient("en:Sodium-Laureth Sulfate ") == "sodium laureth sulfate"
+    assert normalize_ingredient("Crème") == "creme"
+
+def test_short_prefix_ranks_most_used_first(index):
+    assert names(index.suggest("a", 5))[0] == "Aqua"
+    assert names(index.suggest("so", 5))[:2] == ["Sodium Laureth Sulfate", "Sodium Chloride"]
+
+def test_synonyms_resolve_to_the_entry(index):
+    assert names(index.suggest("wat", 1)) == ["Aqua"]
+    assert names(index.suggest("glycerol", 1)) == ["Glycerin"]
+
+@pytest.mark.parametrize("typo, expected", [("aqau", "Aqua"), ("glycren", "Glycerin"), ("sodum laur", "Sodium Laureth Sulfate")])
+def test_typos_find_the_ingredient(index, typo, expected):
+    results = index.suggest(typo, 5)
+    assert expected in names(results)
+    assert next(r for r in results if r["name"] == expected)["distance"] > 0
+
+def test_exact_prefix_beats_typo_match(index):
+    results = index.suggest("glyc", 10)
+    assert results[0]["name"] == "Glycerin"
+    assert results[0]["distance"] == 0
+
+def test_precomputed_ranking_matches_range_scan(monkeypatch):
+    rng = random.Random(3)
+    entries = [
+        {"name": "".join(rng.choice("abc") for _ in range(rng.randint(1, 9))), "products": rng.randint(0, 1000)}
+        for _ in range(5000)
+    ]
+    monkeypatch.setattr(ingredient_index, "PREFIX_SCAN_LIMIT", 50)
+    ranked = IngredientIndex(entries)
+    monkeypatch.setattr(ingredient_index, "PREFIX_SCAN_LIMIT", len(entries))
+    scanned = IngredientIndex(entries)
+
+    assert ranked.top_by_prefix and not scanned.top_by_prefix
+    for query in ["a", "ab", "bca", "cc"]:
+        assert ranked.suggest(query, 10) == scanned.suggest(query, 10)
+
+def test_empty_index():
+    assert IngredientIndex().suggest("aqua") == []
@@ -0,0 +1,87 @@
+"""
+MicroBatcher behaviour against a stub backend
+"""
+import threading
+import time
+
+import pytest
+
+from nlp.sentiment_backends import MicroBatcher, SentimentBackend
+
+class StubBackend(SentimentBackend):
+    """Scores each text by its length and records the batches it was given"""
+
+    name = "stub"
+
+    def __init__(self, gate=None):
+        self.batches = []
+        self.gate = gate
+
+    def score_batch(self, texts):
+        if self.gate:
+            self.gate.wait(timeout=5)
+        self.batches.append(list(texts))
+        return [len(text) / 100 for text in texts]
+
+def test_concurrent_submissions_share_a_batch():
+    backend = StubBackend()
+    batcher = MicroBatcher(backend, max_batch_size=4, max_wait=5.0)
+
+    futures = [batcher.submit(text) for text in ["a", "bb", "ccc", "dddd"]]
+
+    assert [f.result(timeout=1) for f in futures] == [0.01, 0.02, 0.03, 0.04]
+    assert backend.batches == [["a", "bb", "ccc", "dddd"]]
+    batcher.close()
+
+def test_partial_batch_flushed_at_deadline():
+    backend = StubBackend()
+    batcher = MicroBatcher(backend, max_batch_size=32, max_wait=0.05)
+
+    started = time.monotonic()
+    future = batcher.submit("lonely review")
+
+    assert future.result(timeout=1) == 0.13
+    assert time.monotonic() - started >= 0.05
+    batcher.close()
+
+def test_cancelled_future_does_not_stop_the_worker():
+    backend = StubBackend()
+    batcher = MicroBatcher(backend, max_batch_size=32, max_wait=0.05)
+
+    cancelled = batcher.submit("never mind")
+    assert cancelled.cancel()
+    kept = batcher.submit("still wanted")
+
+    assert kept.result(timeout=1) == 0.12
+    assert backend.batches == [["still wanted"]]
+    assert batcher._worker.is_alive()
+    assert batcher.submit("later").result(timeout=1) == 0.05
+    batcher.close()
+
+def test_backend_error_fails_only_its_batch():
+    class Flaky(StubBackend):
+        def score_batch(self, texts):
+            if "boom" in texts:
+                raise RuntimeError("model crashed")
+            return super().score_batch(texts)
+
+    batcher = MicroBatcher(Flaky(), max_batch_size=1, max_wait=5.0)
+
+    with pytest.raises(RuntimeError, match="model crashed"):
+        batcher.submit("boom").result(timeout=1)
+    assert batcher.submit("fine").result(timeout=1) == 0.04
+    batcher.close()
+
+def test_close_drains_pending_then_rejects_submissions():
+    gate = threading.Event()
+    backend = StubBackend(gate)
+    batcher = MicroBatcher(backend, max_batch_size=32, max_wait=5.0)
+
+    futures = [batcher.submit(text) for text in ["one", "two"]]
+    gate.set()
+    batcher.close()
+
+    assert [f.result(timeout=0) for f in futures] == [0.03, 0.03]
+    with pytest.raises(RuntimeError):
+        batcher.submit("too late")
+    batcher.close()
@@ -0,0 +1,118 @@
+"""
+Offline checks of the Open Beauty Facts client's resilience layer
+"""
+import asyncio
+import time
+
+import pytest
+
+from app.services.openbeautyfacts import OpenBeautyFactsClient, UpstreamState
+from app.services.resilience import CircuitBreaker, RetryBudget
+from app.utils.fault_stub import FaultInjectingTransport
+
+BARCODE = "3337875597210"
+PRODUCT = {
+    "code": BARCODE,
+    "product_name": "Hydrating Cleanser",
+    "brands": "CeraVe",
+    "ingredients_text": "Aqua, Glycerin",
+    "ingredients_tags": ["en:aqua", "en:glycerin"]
+}
+
+def make_client(state=None):
+    transport = FaultInjectingTransport({BARCODE: PRODUCT}, seed=1)
+    state = state or UpstreamState()
+    return OpenBeautyFactsClient(transport=transport, state=state), transport, state
+
+def warm_latency(state, seconds=0.02):
+    """Give the trackers enough samples that hedge delays reflect a fast upstream"""
+    for tracker in state.latency.values():
+        for _ in range(tracker.min_samples):
+            tracker.record(seconds)
+
+def test_breaker_opens_and_fails_fast():
+    client, transport, state = make_client()
+    transport.configure("beauty", down=True)
+    transport.configure("universal", down=True)
+
+    for _ in range(10):
+        result = asyncio.run(client.get_product_by_barcode(BARCODE))
+        assert result["success"] is False
+
+    assert state.breakers["beauty"].state == CircuitBreaker.OPEN
+    assert state.breakers["universal"].state == CircuitBreaker.OPEN
+
+    calls = dict(transport.calls)
+    asyncio.run(client.get_product_by_barcode(BARCODE))
+    assert transport.calls == calls
+
+def test_stale_cache_served_during_outage():
+    client, transport, state = make_client()
+    fresh = asyncio.run(client.get_product_by_barcode(BARCODE))
+    assert fresh["success"] and "stale" not in fresh
+
+    transport.configure("beauty", down=True)
+    transport.configure("universal", down=True)
+    result = asyncio.run(client.get_product_by_barcode(BARCODE))
+
+    assert result["success"] is True
+    assert result["stale"] is True
+    assert result["product_name"] == "Hydrating Cleanser"
+
+def test_hedge_wins_under_slow_primary():
+    client, transport, state = make_client()
+    warm_latency(state)
+    transport.configure("beauty", slow_rate=1.0, slow_latency=2.0)
+
+    started = time.monotonic()
+    result = asyncio.run(client.get_product_by_barcode(BARCODE))
+    elapsed = time.monotonic() - started
+
+    assert result["success"] is True
+    assert result["source"] == "Open Food Facts"
+    assert elapsed < 0.5
+    # The cancelled primary still counts as a (lower-bound) latency sample
+    assert max(state.latency["beauty"].samples) > 0.02
+
+def test_exhausted_budget_stops_hedging():
+    state = UpstreamState()
+    state.retry_budget = RetryBudget(ratio=0.0, min_tokens=0.0)
+    client, transport, _ = make_client(state)
+    warm_latency(state)
+    transport.configure("beauty", slow_rate=1.0, slow_latency=0.3)
+
+    result = asyncio.run(client.get_product_by_barcode(BARCODE))
+
+    assert result["source"] == "Open Beauty Facts"
+    assert transport.calls["universal"] == 0
+
+def test_exhausted_budget_stops_retries():
+    state = UpstreamState()
+    state.retry_budget = RetryBudget(ratio=0.0, min_tokens=0.0)
+    client, transport, _ = make_client(state)
+    transport.configure("universal", error_rate=1.0)
+
+    result = asyncio.run(client.universal_scan(BARCODE))
+
+    assert result["success"] is False
+    assert transport.calls["universal"] == 1
+
+def test_retry_spends_budget():
+    client, transport, state = make_client()
+    transport.configure("universal", error_rate=1.0)
+    tokens = state.retry_budget.tokens
+
+    asyncio.run(client.universal_scan(BARCODE))
+
+    assert transport.calls["universal"] == client.MAX_RETRIES + 1
+    # The scan itself earns its share of tokens before its retries spend them
+    assert state.retry_budget.tokens == pytest.approx(tokens + state.retry_budget.ratio - client.MAX_RETRIES)
+
+def test_universal_scans_refill_budget():
+    client, transport, state = make_client()
+    state.retry_budget.tokens = 0.0
+
+    for _ in range(5):
+        asyncio.run(client.universal_scan(BARCODE))
+
+    assert state.retry_budget.tokens == pytest.approx(5 * state.retry_budget.ratio)
@@ -0,0 +1,35 @@
+"""
+Per-product review sentiment used by the scan endpoint
+"""
+import pytest
+
+import app.api.sentiment as sentiment
+from app.api.sentiment import get_product_sentiment
+
+RESULTS = """product,rating,sentiment,score,text
+CeraVe Hydrating Facial Cleanser,5,positive,0.6,Soft skin
+CeraVe Hydrating Facial Cleanser,2,negative,-0.4,Breakouts
+Cetaphil Gentle Cleanser,4,positive,0.5,Gentle
+"""
+
+@pytest.fixture(autouse=True)
+def results_file(tmp_path, monkeypatch):
+    path = tmp_path / "sentiment_results.csv"
+    path.write_text(RESULTS)
+    monkeypatch.setattr(sentiment, "RESULTS_FILE", path)
+
+def test_matches_exact_name_ignoring_case_and_punctuation():
+    summary = get_product_sentiment("cerave hydrating facial-cleanser")
+    assert summary["total_reviews"] == 2
+    assert summary["sentiment_distribution"]["negative"] == 1
+
+def test_matches_brand_plus_name():
+    summary = get_product_sentiment("Gentle Cleanser", "Cetaphil, Galderma")
+    assert summary["total_reviews"] == 1
+
+def test_generic_name_matches_nothing():
+    assert get_product_sentiment("Cleanser") is None
+    assert get_product_sentiment("Hydrating Facial Cleanser", "Unknown") is None
+
+def test_summary_has_no_dashboard_issues():
+    assert "top_issues" not in get_product_sentiment("Cetaphil Gentle Cleanser")
@@ -0,0 +1,131 @@
+"""
+SimilarityIndex persistence and lookups against a temporary directory
+"""
+import os
+import time
+
+import pytest
+
+import app.services.similarity_index as similarity_index
+from app.services.similarity_index import SimilarityIndex, minhash_signature
+
+CLEANSER = ["Aqua", "Glycerin", "Ceramide NP", "Niacinamide"]
+LONG_BARCODE = "1" * 28
+
+def wait_for_compaction(index, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while index._compacting and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not index._compacting
+
+def test_inserts_survive_reload_and_compaction(tmp_path):
+    index = SimilarityIndex(tmp_path)
+    index.add("3337875597210", CLEANSER, "Hydrating Cleanser", 7.0)
+    index.add(LONG_BARCODE, CLEANSER + ["Parfum"], "Long Code", 5.0)
+
+    reloaded = SimilarityIndex(tmp_path)
+    assert reloaded.get(LONG_BARCODE)["product_name"] == "Long Code"
+
+    reloaded.compact()
+    assert not (tmp_path / "inserts.jsonl").exists()
+    assert reloaded.barcodes.dtype.itemsize >= len(LONG_BARCODE)
+
+    compacted = SimilarityIndex(tmp_path)
+    assert len(compacted) == 2
+    assert compacted.get(LONG_BARCODE)["product_name"] == "Long Code"
+    assert compacted.get("3337875597210")["safety_score"] == 7.0
+
+def test_reinsert_supersedes_base_and_delta_rows(tmp_path):
+    index = SimilarityIndex(tmp_path)
+    index.add("111", CLEANSER, "Old Name", 4.0)
+    index.compact()
+    index.add("111", CLEANSER, "New Name", 6.0)
+    index.add("111", CLEANSER, "Newest Name", 8.0)
+
+    assert len(index) == 1
+    assert index.get("111")["product_name"] == "Newest Name"
+    matches = index.similar(minhash_signature(CLEANSER), min_similarity=0.5)
+    assert [(m["barcode"], m["product_name"]) for m in matches] == [("111", "Newest Name")]
+
+    index.compact()
+    assert len(SimilarityIndex(tmp_path)) == 1
+    assert SimilarityIndex(tmp_path).get("111")["product_name"] == "Newest Name"
+
+def test_similar_ranks_by_overlap_and_filters_score(tmp_path):
+    index = SimilarityIndex(tmp_path)
+    index.add("same", CLEANSER, "Same Formula", 8.0)
+    index.add("worse", CLEANSER, "Same But Worse", 3.0)
+    index.add("unrelated", ["Petrolatum", "Paraffinum Liquidum"], "Ointment", 9.0)
+
+    matches = index.similar(minhash_signature(CLEANSER), min_score=5.0)
+
+    assert [m["barcode"] for m in matches] == ["same"]
+
+def test_add_triggers_background_compaction(tmp_path, monkeypatch):
+    monkeypatch.setattr(similarity_index, "COMPACT_THRESHOLD", 20)
+    index = SimilarityIndex(tmp_path)
+
+    for i in range(60):
+        index.add(f"{i:013d}", CLEANSER + [f"Extract {i}"], f"Product {i}", i % 10)
+    wait_for_compaction(index)
+
+    assert (tmp_path / "base" / "signatures.npy").exists()
+    assert len(index.delta_products) <= 20
+    assert len(index) == 60
+    reloaded = SimilarityIndex(tmp_path)
+    wait_for_compaction(reloaded)
+    assert len(reloaded) == 60
+    assert all(reloaded.get(f"{i:013d}") is not None for i in range(60))
+
+def test_inserts_during_compaction_are_kept(tmp_path, monkeypatch):
+    index = SimilarityIndex(tmp_path)
+    index.add("before", CLEANSER, "Before", 5.0)
+
+    # Insert while compact() is between its snapshot and the base swap
+    save = similarity_index.np.save
+    def save_and_insert(path, array):
+        if str(path).endswith("names.npy"):
+            index.add("during", CLEANSER, "During", 6.0)
+        save(path, array)
+    monkeypatch.setattr(similarity_index.np, "save", save_and_insert)
+    index.compact()
+    monkeypatch.undo()
+
+    assert index.get("during")["product_name"] == "During"
+    assert (tmp_path / "inserts.jsonl").exists()
+    reloaded = SimilarityIndex(tmp_path)
+    assert reloaded.get("before") is not None
+    assert reloaded.get("during") is not None
+
+def test_interrupted_swap_recovers_previous_base(tmp_path, monkeypatch):
+    index = SimilarityIndex(tmp_path)
+    index.add("kept", CLEANSER, "Kept", 5.0)
+    index.compact()
+    index.add("logged", CLEANSER, "Logged", 6.0)
+
+    replace = os.replace
+    def crash_on_swap(src, dst):
+        if str(src).endswith("base.tmp"):
+            raise KeyboardInterrupt
+        replace(src, dst)
+    monkeypatch.setattr(similarity_index.os, "replace", crash_on_swap)
+    with pytest.raises(KeyboardInterrupt):
+        index.compact()
+    monkeypatch.undo()
+    assert not (tmp_path / "base").exists()
+
+    recovered = SimilarityIndex(tmp_path)
+    assert recovered.get("kept") is not None
+    assert recovered.get("logged") is not None
+
+def test_oversized_bucket_includes_recent_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(similarity_index, "MAX_BUCKET", 8)
+    index = SimilarityIndex(tmp_path)
+    for i in range(100):
+        index.add(f"{i:03d}", ["Aqua"], f"Water {i}", 1.0)
+    index.compact()
+
+    matches = index.similar(minhash_signature(["Aqua"]), limit=100)
+
+    assert len(matches) <= 8
+    assert max(m["barcode"] for m in matches) == "099"